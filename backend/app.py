@@ -1,9 +1,15 @@
 # Suggested code may be subject to a license. Learn more: ~LicenseLog:3019753449.
 import os
+import functools
+import itertools
 import logging
+import pathlib
 import secrets
+import time
 
-from flask import Blueprint, jsonify, request, send_from_directory, redirect
+import orjson
+
+from flask import Blueprint, Response, g, jsonify, request, send_from_directory, redirect, url_for
 from flask import request
 from flask_cors import CORS
 from flasgger import APISpec
@@ -13,21 +19,24 @@ from webargs.flaskparser import use_args
 
 from apispec.ext.marshmallow import MarshmallowPlugin
 from apispec_webframeworks.flask import FlaskPlugin
+from sqlalchemy import bindparam, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.utils import secure_filename
 
-from backend.db import get_session, load_db
+from backend import jobs
+from backend.db import STRICT_LOADING, get_session, load_db, strict, violates_constraint
 
-from backend.helpers import create_flask_app, get_traceback
-from backend.conn import SPOCK_FRONTEND, SPOCK_BACKEND
+from backend.helpers import allowed_file, create_flask_app
+from backend.conn import settings
 
 app = create_flask_app()
 db = load_db()
 
 CORS(app)
 
-from backend.models import Content, Campaign
+from backend.models import Content, Campaign, CONTENT_ORDER_CONSTRAINT, IMAGE_FILENAME_LENGTH, SINGLE_ACTIVE_CAMPAIGN_CONSTRAINT
 from backend.schemas import (
-    ContentSchema,
     ContentCreateRequest,
     ContentUpdateRequest,
     ContentResponse,
@@ -35,48 +44,119 @@ from backend.schemas import (
     CampaignCreateRequest,
     CampaignListResponse,
     CampaignResponse,
-    CampaignSchema,
     CampaignUpdateRequest,
     ErrorResponse,
+    JobAccepted,
+    PageRequest,
+    CAMPAIGN_FIELDS,
+    CONTENT_FIELDS,
+    campaign_to_dict,
+    content_to_dict,
 )
 
-# Configure logging
-logging.basicConfig(level=logging.ERROR)
-logger = logging.getLogger(__name__)
+# Schema instances are stateless once built; share them across requests
+CONTENT_RESPONSE = ContentResponse()
+CAMPAIGN_RESPONSE = CampaignResponse()
+
+# List endpoints select plain columns instead of ORM entities and hand the
+# rows to the orjson provider, skipping ORM instance construction and Marshmallow
+CONTENT_COLUMNS = tuple(getattr(Content, field) for field in CONTENT_FIELDS)
+CAMPAIGN_COLUMNS = tuple(getattr(Campaign, field) for field in CAMPAIGN_FIELDS)
+# Rows fetched from the server-side cursor per round trip when streaming an unpaginated list.
+# Pages (at most PageRequest's limit of 500 rows) are fetched with a plain execute instead:
+# a server-side cursor would only add DECLARE/FETCH round trips and hold a connection longer.
+STREAM_BATCH_SIZE = 500
+
+# Statements are built once and executed with bound parameters, so requests skip
+# constructing them and computing their cache key before the compiled-SQL cache lookup
+CONTENTS_PAGE = (
+    select(*CONTENT_COLUMNS)
+    .where(Content.id > bindparam('cursor'))
+    .order_by(Content.id)
+    .limit(bindparam('limit'))
+)
+# The (campaign_id, order) unique constraint's index serves both the filter and the sort
+CAMPAIGN_CONTENTS = (
+    select(*CONTENT_COLUMNS)
+    .where(Content.campaign_id == bindparam('campaign_id'))
+    .order_by(Content.order)
+)
+DELETE_CAMPAIGN_CONTENTS = delete(Content).where(Content.campaign_id == bindparam('campaign_id'))
 
+CAMPAIGNS_PAGE = (
+    select(*CAMPAIGN_COLUMNS)
+    .where(Campaign.id > bindparam('cursor'))
+    .order_by(Campaign.id)
+    .limit(bindparam('limit'))
+)
+CAMPAIGN_EXISTS = select(Campaign.id).where(Campaign.id == bindparam('campaign_id'))
+CAMPAIGN_NAME_EXISTS = select(Campaign.id).where(Campaign.name == bindparam('name')).limit(1)
+OTHER_CAMPAIGN_NAME_EXISTS = (
+    select(Campaign.id)
+    .where(Campaign.name == bindparam('name'), Campaign.id != bindparam('campaign_id'))
+    .limit(1)
+)
+ACTIVE_CAMPAIGN = strict(select(Campaign).where(Campaign.active).limit(1))
+DEACTIVATE_CAMPAIGNS = update(Campaign).where(Campaign.active).values(active=False)
+# Moves the active flag to one campaign in a single statement; the constraint is checked at commit.
+# The ORM can't evaluate a bound SET expression in Python, so the caller updates loaded objects itself.
+ACTIVATE_CAMPAIGN = (
+    update(Campaign)
+    .where(or_(Campaign.active, Campaign.id == bindparam('campaign_id')))
+    .values(active=Campaign.id == bindparam('campaign_id'))
+    .execution_options(synchronize_session=False)
+)
+DELETE_CAMPAIGN = delete(Campaign).where(Campaign.id == bindparam('campaign_id'))
 
-api_v1 = Blueprint('api_v1', __name__, url_prefix='/v1')
+# Logging is configured by create_flask_app()
+logger = logging.getLogger(__name__)
 
-# Plugins for flask and Marshmallow
-plugins = [FlaskPlugin(), MarshmallowPlugin()]
 
-# Create the APISpec object
-spec = APISpec(
-    title="Spock API Docs",
-    version="1.0",
-    openapi_version="2.0",
-    plugins=plugins
-)
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/v1')
 
-# Generate a Flasgger template including your schema definitions
-template = spec.to_flasgger(
-    app,
-    definitions=[
-        ContentCreateRequest,
-        ContentResponse,
-        ContentUpdateRequest,
-        ContentListResponse,
-        CampaignCreateRequest,
-        CampaignResponse,
-        CampaignUpdateRequest,
-        CampaignListResponse,
-        ErrorResponse,
-    ]
-)
+API_TITLE = "Spock API Docs"
+
+# Prebuilt by scripts/build_openapi.py and served as-is in production
+OPENAPI_PATH = pathlib.Path(__file__).with_name('openapi.json')
+
+def build_openapi_spec():
+    # A fresh APISpec per build: registering the schemas on a shared one fails the second time
+    spec = APISpec(
+        title=API_TITLE,
+        version="1.0",
+        openapi_version="2.0",
+        # Plugins for flask and Marshmallow
+        plugins=[FlaskPlugin(), MarshmallowPlugin()]
+    )
+
+    # Generate a Flasgger template including your schema definitions
+    template = spec.to_flasgger(
+        app,
+        definitions=[
+            ContentCreateRequest,
+            ContentResponse,
+            ContentUpdateRequest,
+            ContentListResponse,
+            CampaignCreateRequest,
+            CampaignResponse,
+            CampaignUpdateRequest,
+            CampaignListResponse,
+            ErrorResponse,
+            JobAccepted,
+        ]
+    )
+    return swagger(app, template=template)
+
+@functools.cache
+def openapi_document():
+    # Walking every schema and route docstring is slow, so do it at most once per process
+    if settings().env == 'production':
+        return OPENAPI_PATH.read_bytes()
+    return orjson.dumps(build_openapi_spec())
 
 @app.route("/openapi.json")
 def api_spec():
-    return jsonify(swagger(app, template=template))
+    return Response(openapi_document(), mimetype='application/json')
 
 SWAGGER_URL = '/api/docs'  # URL for exposing Swagger UI (without trailing '/')
 API_URL = '/openapi.json'  # Our API url (can of course be a local resource)
@@ -86,7 +166,7 @@ swaggerui_blueprint = get_swaggerui_blueprint(
     SWAGGER_URL,  # Swagger UI static files will be mapped to '{SWAGGER_URL}/dist/'
     API_URL,
     config={  # Swagger UI config overrides
-      'app_name': spec.title,
+      'app_name': API_TITLE,
     },
   
 )
@@ -111,28 +191,94 @@ def internal_server_error(e):
     # Log full stack trace
     logger.error("Unhandled exception", exc_info=True)
 
-    response = {
-        "message": "Internal Server Error",
-        "error": str(e)
-    }
-    return jsonify(response), 500
+    return error_response("Internal Server Error", str(e), 500)
 
 @app.before_request
 def log_request_info():
-    print(f"\n🟢 Incoming Request: {request.method} {request.url}")
-    print(f"Headers: {dict(request.headers)}")
-    print(f"Body: {request.get_data(as_text=True)}")
+    g.request_started_at = time.perf_counter()
+
+    # Reading the body buffers it in memory, so only do it when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request headers: %s", dict(request.headers))
+        logger.debug("Request body: %s", request.get_data(as_text=True))
 
 @app.after_request
 def log_response_info(response):
-    print(f"🔵 Outgoing Response: {response.status}")
-    print(f"Headers: {dict(response.headers)}")
-    response.direct_passthrough = False
-    # print(f"Body: {response.get_data(as_text=True)}")
+    started_at = g.get('request_started_at')
+    if started_at is not None:
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        logger.info("%s %s %d %.1fms", request.method, request.path, response.status_code, elapsed_ms)
     return response
     
+def error_response(message, error, code):
+    # Same shape as ErrorResponse, which is kept for the API docs; a plain dict skips a Marshmallow dump
+    return dict(message=message, error=error), code
+
+def prefers_async():
+    # RFC 7240: clients opt in to 202 Accepted with "Prefer: respond-async". Jobs live in the
+    # memory of the process that accepted them, and with several workers the progress request
+    # would usually reach another one, so the preference is ignored unless there is known to be a
+    # single worker.
+    if settings().web_workers != 1:
+        return False
+    return 'respond-async' in request.headers.get('Prefer', '').lower()
+
+def execute_streaming(statement, params=None):
+    """
+    Run statement on a connection of its own, fetching STREAM_BATCH_SIZE rows per round trip
+    from a server-side cursor. Returns the connection and the result's row partitions.
+
+    db.session is torn down when the view returns, before a streamed body is sent, so it
+    can't own the cursor; stream_rows() closes this connection once the response is done.
+    """
+    connection = db.engine.connect()
+    try:
+        result = connection.execution_options(yield_per=STREAM_BATCH_SIZE).execute(statement, params)
+    except Exception:
+        connection.close()
+        raise
+    return connection, result.partitions()
+
+def stream_rows(key, partitions, limit=None, connection=None):
+    """
+    Stream {"<key>": [...]} one partition of rows at a time, so neither the
+    result set nor the JSON document is ever held in memory whole.
+
+    With a limit the body also carries next_cursor, the ID to pass as the next page's cursor.
+    A connection from execute_streaming() is closed once the response is done.
+    """
+    def generate():
+        yield b'{"' + key.encode() + b'":['
+        count = 0
+        last_id = None
+        for rows in partitions:
+            chunk = b','.join(app.json.encode(row._asdict()) for row in rows)
+            yield (b',' + chunk) if count else chunk
+            count += len(rows)
+            last_id = rows[-1].id
+
+        if limit is None:
+            yield b']}'
+        else:
+            # A short page means there is nothing left to fetch
+            cursor = last_id if count == limit else None
+            yield b'],"next_cursor":' + app.json.encode(cursor) + b'}'
+
+    response = Response(generate(), mimetype='application/json')
+    if connection is not None:
+        response.call_on_close(connection.close)
+    return response
+
 # region Content APIs
 
+def content_order_conflict(order):
+    return error_response(
+        f"Content order must be unique within a campaign. Use a different content order apart from '{order}'.",
+        "Content order already exists",
+        400,
+    )
+
+
 @api_v1.route('/content', methods=['POST'])
 @use_args(ContentCreateRequest)
 def create_content(payload):
@@ -171,33 +317,19 @@ def create_content(payload):
     try:
 
         # Use db.session to query the campaign record by ID
-        campaign = Campaign.query.filter_by(id=campaign_id).first()
+        campaign = db.session.get(Campaign, campaign_id, options=STRICT_LOADING)
 
         if not campaign:
-            return ErrorResponse().dump(dict(message=f"Campaign with the ID '{campaign_id}' not found", error="Campaign not found")), 404
+            return error_response(f"Campaign with the ID '{campaign_id}' not found", "Campaign not found", 404)
 
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting campaign: {e}")
-        return ErrorResponse().dump(dict(message="Error getting campaign", error=str(e))), 500
-
-    # Ensure no two contents under a campaign have the same order
-    if order is not None:
-        # Find content with same campaign_id and order
-        existing_content = db.session.query(Content).filter_by(
-            campaign_id=campaign_id, order=order
-        ).first()
-        if existing_content:
-            return ErrorResponse().dump(
-                dict(
-                    message=f"Content order must be unique within a campaign. Use a different content order apart from '{order}'.", error="Content order already exists"
-                )
-            ), 400
+        logger.exception("Error getting campaign")
+        return error_response("Error getting campaign", str(e), 500)
 
     try:
         # Create a new Content object
         new_content = Content(
-            content_type=content_data['content_type'],
+            content_type=content_data['content_type'].value,
             title=content_data['title'],
             subtitle=content_data.get('subtitle'),
             description=content_data.get('description'),
@@ -215,33 +347,42 @@ def create_content(payload):
         db.session.add(new_content)
         db.session.commit()
 
-        # After commit, refresh the object to ensure the latest changes are reflected
-        db.session.refresh(new_content)
-
         # Serialize the content using Marshmallow schema
-        s_content = ContentSchema.from_orm(new_content)
-
-        return ContentResponse().dump(
-            dict(content=s_content)
+        return CONTENT_RESPONSE.dump(
+            dict(content=new_content)
         ), 201
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error creating content: {e}")
-        return ErrorResponse().dump(
-            dict(message="Error creating content", error=str(e))
-            ), 500
+        # No two contents under a campaign may share an order; the database enforces it
+        if isinstance(e, IntegrityError) and violates_constraint(e, CONTENT_ORDER_CONSTRAINT):
+            return content_order_conflict(order)
+        logger.exception("Error creating content")
+        return error_response("Error creating content", str(e), 500)
     finally:
         # No need to manually close the session, db.session is managed automatically
         pass
 
 @api_v1.route('/content', methods=['GET'])
-def get_contents():
+@use_args(PageRequest, location='query')
+def get_contents(page):
     """
     Get all Contents
     ---
     tags:
       - Content
+    parameters:
+      - in: query
+        name: limit
+        schema:
+          type: integer
+        required: false
+        description: Maximum number of contents to return (default 50, max 500)
+      - in: query
+        name: cursor
+        schema:
+          type: integer
+        required: false
+        description: Only return contents with an ID greater than this; pass the previous page's next_cursor
     responses:
       200:
         description: A list of contents
@@ -251,18 +392,14 @@ def get_contents():
         description: Error getting content
     """
     try:
-        # Use db.session to query the content records
-        content_list = db.session.query(Content).all()
-
-        # Serialize the list of content
-        content_schemas = [ContentSchema.from_orm(content) for content in content_list]
+        # Use db.session to query one page of content columns, keyed on the ID
+        rows = db.session.execute(CONTENTS_PAGE, page).all()
 
         # Return the response
-        return ContentListResponse().dump(dict(contents=content_schemas)), 200
+        return stream_rows('contents', [rows] if rows else [], limit=page['limit'])
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting content: {e}")
-        return ErrorResponse().dump(dict(message="Error getting content", error=str(e))), 500
+        logger.exception("Error getting content")
+        return error_response("Error getting content", str(e), 500)
 
 @api_v1.route('/content/<content_id>', methods=['GET'])
 def get_content(content_id):
@@ -292,20 +429,15 @@ def get_content(content_id):
     """
     try:
         # Use db.session to query the content record by ID
-        content = db.session.query(Content).get(content_id)
+        content = db.session.get(Content, content_id, options=STRICT_LOADING)
 
         if not content:
-            return ErrorResponse().dump(dict(message=f"Content with the ID '{content_id}' not found", error="Content not found")), 404
-
-        # Serialize the content using Marshmallow schema
-        content_schema = ContentSchema.from_orm(content)
+            return error_response(f"Content with the ID '{content_id}' not found", "Content not found", 404)
 
-        # Return the response
-        return ContentResponse().dump(dict(content=content_schema)), 200
+        return dict(content=content_to_dict(content)), 200
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting content: {e}")
-        return ErrorResponse().dump(dict(message="Error getting content", error=str(e))), 500
+        logger.exception("Error getting content")
+        return error_response("Error getting content", str(e), 500)
 
 @api_v1.route('/content/<content_id>', methods=['PUT'])
 @use_args(ContentUpdateRequest)
@@ -352,33 +484,17 @@ def update_content(payload, content_id):
 
     try:
         # Use db.session to query the content record by ID
-        content: Content = db.session.query(Content).get(content_id)
+        content: Content = db.session.get(Content, content_id, options=STRICT_LOADING)
 
         if not content:
-            return ErrorResponse().dump(dict(message=f"Content with the ID '{content_id}' not found", error="Content not found")), 404
+            return error_response(f"Content with the ID '{content_id}' not found", "Content not found", 404)
 
-        # Get the campaign from the content
-        campaign: Campaign = content.campaign
-        campaign_id = campaign.id
+        # Read the foreign key directly; going through content.campaign would lazy-load the campaign
+        campaign_id = content.campaign_id
 
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting campaign: {e}")
-        return ErrorResponse().dump(dict(message="Error getting campaign", error=str(e))), 500
-
-    # Ensure no two contents under a campaign have the same order
-    if order is not None:
-        # Find content with same campaign_id and order
-        existing_content = db.session.query(Content).filter_by(
-            campaign_id=campaign_id, order=order
-        ).filter(Content.id != content_id).first()
-
-        if existing_content:
-            return ErrorResponse().dump(
-                dict(
-                    message=f"Content order must be unique within a campaign. Use a different content order apart from '{order}'.", error="Content order already exists"
-                )
-            ), 400
+        logger.exception("Error getting campaign")
+        return error_response("Error getting campaign", str(e), 500)
 
     try:
         # Update the content object
@@ -393,7 +509,7 @@ def update_content(payload, content_id):
         _order = order
         _external_url = content_data.get('external_url')
 
-        if _content_type: content.content_type = _content_type
+        if _content_type: content.content_type = _content_type.value
         if _title: content.title = _title
         if _subtitle: content.subtitle = _subtitle
         if _description: content.description = _description
@@ -407,22 +523,17 @@ def update_content(payload, content_id):
         # Use db.session directly to add and commit the new record
         db.session.commit()
 
-        # After commit, refresh the object to ensure the latest changes are reflected
-        db.session.refresh(content)
-
         # Serialize the content using Marshmallow schema
-        s_content = ContentSchema.from_orm(content)
-
-        return ContentResponse().dump(
-            dict(content=s_content)
+        return CONTENT_RESPONSE.dump(
+            dict(content=content)
         ), 200
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error creating content: {e}")
-        return ErrorResponse().dump(
-            dict(message="Error updating content", error=str(e))
-            ), 500
+        # No two contents under a campaign may share an order; the database enforces it
+        if isinstance(e, IntegrityError) and violates_constraint(e, CONTENT_ORDER_CONSTRAINT):
+            return content_order_conflict(order)
+        logger.exception("Error creating content")
+        return error_response("Error updating content", str(e), 500)
     finally:
         # No need to manually close the session, db.session is managed automatically
         pass
@@ -453,10 +564,10 @@ def delete_content(content_id):
     """
     try:
         # Use db.session to query the content record by ID
-        content = db.session.query(Content).get(content_id)
+        content = db.session.get(Content, content_id, options=STRICT_LOADING)
 
         if not content:
-            return ErrorResponse().dump(dict(message=f"Content with the ID '{content_id}' not found", error="Content not found")), 404
+            return error_response(f"Content with the ID '{content_id}' not found", "Content not found", 404)
 
         # Use db.session directly to delete and commit the record
         db.session.delete(content)
@@ -465,9 +576,8 @@ def delete_content(content_id):
         return '', 204
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error deleting content: {e}")
-        return ErrorResponse().dump(dict(message="Error deleting content", error=str(e))), 500
+        logger.exception("Error deleting content")
+        return error_response("Error deleting content", str(e), 500)
 
 @api_v1.route('/content/<content_id>/image', methods=['POST'])
 def upload_content_image(content_id):
@@ -498,23 +608,26 @@ def upload_content_image(content_id):
     """
     try:
       
-        content = db.session.query(Content).get(content_id)
+        content = db.session.get(Content, content_id, options=STRICT_LOADING)
         if not content:
-            return ErrorResponse().dump(dict(message=f"Content with ID '{content_id}' not found", error="Content not found")), 404
+            return error_response(f"Content with ID '{content_id}' not found", "Content not found", 404)
 
         if 'file' not in request.files:
-            return ErrorResponse().dump(dict(message="No image file provided", error="Missing file")), 400
+            return error_response("No image file provided", "Missing file", 400)
 
         file = request.files['file']
         if file.filename == '':
-            return ErrorResponse().dump(dict(message="No selected file", error="Missing filename")), 400
+            return error_response("No selected file", "Missing filename", 400)
 
-        if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-            return ErrorResponse().dump(dict(message="Invalid file type. Only PNG, JPG, JPEG and GIF allowed", error="Invalid file type")), 400
+        if not allowed_file(file.filename):
+            return error_response("Invalid file type. Only PNG, JPG, JPEG and GIF allowed", "Invalid file type", 400)
 
         filename = secure_filename(file.filename)
         # Generate unique filename to prevent overwrites
-        unique_filename = f"{secrets.token_hex(8)}_{filename}"
+        prefix = f"{secrets.token_hex(8)}_"
+        # Shorten long names to fit image_filename, keeping the extension
+        stem, extension = os.path.splitext(filename)
+        unique_filename = prefix + stem[:IMAGE_FILENAME_LENGTH - len(prefix) - len(extension)] + extension
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         file.save(file_path)
 
@@ -527,16 +640,13 @@ def upload_content_image(content_id):
         content.image_url = image_url
         
         db.session.commit()
-        db.session.refresh(content)
 
-        content_schema = ContentSchema.from_orm(content)
-        return ContentResponse().dump(dict(content=content_schema)), 200
+        return CONTENT_RESPONSE.dump(dict(content=content)), 200
 
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error uploading image: {e}")
-        return ErrorResponse().dump(dict(message="Error uploading image", error=str(e))), 500
+        logger.exception("Error uploading image")
+        return error_response("Error uploading image", str(e), 500)
 
 @api_v1.route('/content/<content_id>/image', methods=['GET'])
 def get_content_image(content_id):
@@ -563,19 +673,18 @@ def get_content_image(content_id):
       description: Error retrieving image
   """
   try:
-    content = db.session.query(Content).get(content_id)
+    content = db.session.get(Content, content_id, options=STRICT_LOADING)
     if not content:
-      return ErrorResponse().dump(dict(message=f"Content with ID '{content_id}' not found", error="Content not found")), 404
+      return error_response(f"Content with ID '{content_id}' not found", "Content not found", 404)
       
     if not content.image_path:
-      return ErrorResponse().dump(dict(message="No image associated with this content", error="Image not found")), 404
+      return error_response("No image associated with this content", "Image not found", 404)
 
     return send_from_directory(app.config['UPLOAD_FOLDER'], secure_filename(content.image_filename))
 
   except Exception as e:
-    get_traceback(e)
-    logger.error(f"Error retrieving image: {e}")
-    return ErrorResponse().dump(dict(message="Error retrieving image", error=str(e))), 500
+    logger.exception("Error retrieving image")
+    return error_response("Error retrieving image", str(e), 500)
 
 
 @api_v1.route('/images/<filename>')
@@ -603,6 +712,11 @@ def serve_image(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], secure_filename(filename))
 
 # region Campaign APIs
+
+def active_campaign_conflict():
+    # Another request activated a different campaign between our UPDATE and commit
+    return error_response("Another campaign was activated at the same time. Please retry.", "Active campaign conflict", 409)
+
 @api_v1.route('/campaign', methods=['POST'])
 @use_args(CampaignCreateRequest)
 def create_campaign(payload):
@@ -618,15 +732,33 @@ def create_campaign(payload):
           $ref: '#/definitions/CampaignCreateRequest'
         required: true
         description: Campaign data
+      - in: header
+        name: Prefer
+        type: string
+        required: false
+        description: >
+          Send "respond-async" to activate the new campaign in the background. Honoured only
+          when the API runs a single worker process; otherwise the request is served synchronously.
     responses:
       201:
         description: Campaign created successfully
         schema:
           $ref: '#/definitions/CampaignResponse'
+      202:
+        description: >
+          Sent instead of 201 when the campaign is created active and the request carries
+          "Prefer: respond-async", on a single-worker deployment. Follow the job at progress_url
+          (also in the Location header).
+        schema:
+          $ref: '#/definitions/JobAccepted'
       400:
         description: Invalid request body
         schema:
           $ref: '#/definitions/ErrorResponse'
+      409:
+        description: Another campaign was activated concurrently
+        schema:
+          $ref: '#/definitions/ErrorResponse'
       500:
         description: Error creating campaign
         schema:
@@ -636,39 +768,49 @@ def create_campaign(payload):
     campaign_data = payload
 
     try:
-        existing_campaign = db.session.query(Campaign).filter_by(name=campaign_data['name']).first()
-        if existing_campaign:
-            return ErrorResponse().dump(dict(message="Campaign name must be unique", error="Campaign name already exists")), 400
-        
-        if payload.get('active') == True:
-            # De-activate existing 'active' campaigns
-            db.session.query(Campaign).filter(Campaign.active == True).update({Campaign.active: False})
+        existing_campaign = db.session.execute(CAMPAIGN_NAME_EXISTS, dict(name=campaign_data['name'])).scalar()
+    except Exception as e:
+        logger.exception("Error creating campaign")
+        return error_response("Error creating campaign", str(e), 500)
+
+    if existing_campaign:
+        return error_response("Campaign name must be unique", "Campaign name already exists", 400)
+
+    if campaign_data.get('active') and prefers_async():
+        # Activation rewrites other campaigns; run it in the background and let the client follow the job
+        job = jobs.submit(insert_campaign, campaign_data)
+        progress_url = url_for('api_v1.get_job_progress', job_id=job.id)
+        return jsonify(dict(job_id=job.id, progress_url=progress_url)), 202, {'Location': progress_url}
+
+    return insert_campaign(campaign_data)
+
+def insert_campaign(campaign_data):
+    try:
+        active = campaign_data.get('active', False)
+        if active:
+            # De-activate the currently active campaign
+            db.session.execute(DEACTIVATE_CAMPAIGNS)
 
         # Create a new Campaign object
         new_campaign = Campaign(
-            name=campaign_data['name']
+            name=campaign_data['name'],
+            active=active
         )
 
         # Use db.session directly to add and commit the new record
         db.session.add(new_campaign)
         db.session.commit()
 
-        # After commit, refresh the object to ensure the latest changes are reflected
-        db.session.refresh(new_campaign)
-
-        # Serialize the campaign using Marshmallow schema class method
-        s_campaign = CampaignSchema.from_orm(new_campaign)
-
-        return CampaignResponse().dump(
-            dict(campaign=s_campaign)
+        # Serialize the campaign using Marshmallow schema
+        return CAMPAIGN_RESPONSE.dump(
+            dict(campaign=new_campaign)
         ), 201
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error creating campaign: {e}")
-        return ErrorResponse().dump(
-            dict(message="Error creating campaign", error=str(e))
-            ), 500
+        if isinstance(e, IntegrityError) and violates_constraint(e, SINGLE_ACTIVE_CAMPAIGN_CONSTRAINT):
+            return active_campaign_conflict()
+        logger.exception("Error creating campaign")
+        return error_response("Error creating campaign", str(e), 500)
     finally:
         # No need to manually close the session, db.session is managed automatically
         pass
@@ -701,28 +843,37 @@ def get_campaign(campaign_id):
     """
     try:
         # Use db.session to query the campaign record by ID
-        campaign = db.session.query(Campaign).get(campaign_id)
+        campaign = db.session.get(Campaign, campaign_id, options=STRICT_LOADING)
 
         if not campaign:
-            return ErrorResponse().dump(dict(message=f"Campaign with the ID '{campaign_id}' not found", error="Campaign not found")), 404
-
-        # Serialize the campaign using Marshmallow schema
-        campaign_schema = CampaignSchema.from_orm(campaign)
+            return error_response(f"Campaign with the ID '{campaign_id}' not found", "Campaign not found", 404)
 
-        # Return the response
-        return CampaignResponse().dump(dict(campaign=campaign_schema)), 200
+        return dict(campaign=campaign_to_dict(campaign)), 200
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting campaign: {e}")
-        return ErrorResponse().dump(dict(message="Error getting campaign", error=str(e))), 500
+        logger.exception("Error getting campaign")
+        return error_response("Error getting campaign", str(e), 500)
 
 @api_v1.route('/campaign', methods=['GET'])
-def get_campaigns():
+@use_args(PageRequest, location='query')
+def get_campaigns(page):
     """
     Get all Campaigns
     ---
     tags:
       - Campaign
+    parameters:
+      - in: query
+        name: limit
+        schema:
+          type: integer
+        required: false
+        description: Maximum number of campaigns to return (default 50, max 500)
+      - in: query
+        name: cursor
+        schema:
+          type: integer
+        required: false
+        description: Only return campaigns with an ID greater than this; pass the previous page's next_cursor
     responses:
       200:
         description: A list of campaigns
@@ -734,18 +885,14 @@ def get_campaigns():
           $ref: '#/definitions/ErrorResponse'
     """
     try:
-        # Use db.session to query the campaign records
-        campaign_list = db.session.query(Campaign).all()
-
-        # Serialize the list of campaigns using the class method
-        campaign_schemas = [CampaignSchema.from_orm(campaign) for campaign in campaign_list]
+        # Use db.session to query one page of campaign columns, keyed on the ID
+        rows = db.session.execute(CAMPAIGNS_PAGE, page).all()
 
         # Return the response
-        return CampaignListResponse().dump(dict(campaigns=campaign_schemas)), 200
+        return stream_rows('campaigns', [rows] if rows else [], limit=page['limit'])
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting campaigns: {e}")
-        return ErrorResponse().dump(dict(message="Error getting campaigns", error=str(e))), 500
+        logger.exception("Error getting campaigns")
+        return error_response("Error getting campaigns", str(e), 500)
 
 @api_v1.route('/campaign/<campaign_id>', methods=['PUT'])
 @use_args(CampaignUpdateRequest)
@@ -781,6 +928,10 @@ def update_campaign(payload, campaign_id):
         description: Campaign not found
         schema:
           $ref: '#/definitions/ErrorResponse'
+      409:
+        description: Another campaign was activated concurrently
+        schema:
+          $ref: '#/definitions/ErrorResponse'
       500:
         description: Error updating campaign
         schema:
@@ -790,44 +941,40 @@ def update_campaign(payload, campaign_id):
 
     try:
         # Use db.session to query the campaign record by ID
-        campaign = db.session.query(Campaign).get(campaign_id)
+        campaign = db.session.get(Campaign, campaign_id, options=STRICT_LOADING)
 
         if not campaign:
-            return ErrorResponse().dump(dict(message=f"Campaign with the ID '{campaign_id}' not found", error="Campaign not found")), 404
+            return error_response(f"Campaign with the ID '{campaign_id}' not found", "Campaign not found", 404)
 
         campaign_name = campaign_data.get('name')
         if campaign_name:
-            existing_campaign = db.session.query(Campaign).filter(Campaign.name==campaign_name, Campaign.id != campaign_id ).first()
+            existing_campaign = db.session.execute(
+                OTHER_CAMPAIGN_NAME_EXISTS, dict(name=campaign_name, campaign_id=campaign.id)
+            ).scalar()
             if existing_campaign:
-                return ErrorResponse().dump(dict(message="Campaign name must be unique", error="Campaign name already exists")), 400
+                return error_response("Campaign name must be unique", "Campaign name already exists", 400)
 
         if payload.get('active') == True:
-            # De-activate existing 'active' campaigns
-            db.session.query(Campaign).filter(Campaign.active == True, Campaign.id != campaign_id).update({Campaign.active: False})
-            campaign.active = campaign_data.get('active')
+            db.session.execute(ACTIVATE_CAMPAIGN, dict(campaign_id=campaign.id))
+            set_committed_value(campaign, 'active', True)
 
         # Update the campaign object
-        campaign.name = campaign_name
+        if campaign_name:
+            campaign.name = campaign_name
 
         # Use db.session directly to add and commit the new record
         db.session.commit()
 
-        # After commit, refresh the object to ensure the latest changes are reflected
-        db.session.refresh(campaign)
-
         # Serialize the campaign using Marshmallow schema
-        s_campaign = CampaignSchema.from_orm(campaign)
-
-        return CampaignResponse().dump(
-            dict(campaign=s_campaign)
+        return CAMPAIGN_RESPONSE.dump(
+            dict(campaign=campaign)
         ), 200
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error updating campaign: {e}")
-        return ErrorResponse().dump(
-            dict(message="Error updating campaign", error=str(e))
-            ), 500
+        if isinstance(e, IntegrityError) and violates_constraint(e, SINGLE_ACTIVE_CAMPAIGN_CONSTRAINT):
+            return active_campaign_conflict()
+        logger.exception("Error updating campaign")
+        return error_response("Error updating campaign", str(e), 500)
     finally:
         # No need to manually close the session, db.session is managed automatically
         pass
@@ -858,25 +1005,23 @@ def delete_campaign(campaign_id):
     """
     try:
         # Use db.session to query the campaign record by ID
-        campaign = db.session.query(Campaign).get(campaign_id)
+        campaign = db.session.get(Campaign, campaign_id, options=STRICT_LOADING)
 
         if not campaign:
-            return ErrorResponse().dump(dict(message=f"Campaign with the ID '{campaign_id}' not found", error="Campaign not found")), 404
+            return error_response(f"Campaign with the ID '{campaign_id}' not found", "Campaign not found", 404)
 
-        content_list = db.session.query(Content).filter_by(campaign_id=campaign_id).all()
-        for content in content_list:
-            db.session.delete(content)
+        # Delete the campaign's contents with one statement rather than loading and deleting each row
+        db.session.execute(DELETE_CAMPAIGN_CONTENTS, dict(campaign_id=campaign.id))
 
         # Use db.session directly to delete and commit the record
-        db.session.delete(campaign)
+        db.session.execute(DELETE_CAMPAIGN, dict(campaign_id=campaign.id))
         db.session.commit()
 
         return '', 204
     except Exception as e:
         db.session.rollback()
-        get_traceback(e)
-        logger.error(f"Error deleting campaign: {e}")
-        return ErrorResponse().dump(dict(message="Error deleting campaign", error=str(e))), 500
+        logger.exception("Error deleting campaign")
+        return error_response("Error deleting campaign", str(e), 500)
 
 @api_v1.route('/campaign/<campaign_id>/content', methods=['GET'])
 def get_campaign_content(campaign_id):
@@ -904,24 +1049,28 @@ def get_campaign_content(campaign_id):
       500:
         description: Error getting content
     """
+    connection = None
     try:
-        # Check if the campaign exists
-        campaign = db.session.query(Campaign).get(campaign_id)
-        if not campaign:
-            return ErrorResponse().dump(dict(message=f"Campaign with the ID '{campaign_id}' not found", error="Campaign not found")), 404
-        
-        # Use db.session to query the content records associated with the campaign, ordered by 'order'
-        content_list = db.session.query(Content).filter_by(campaign_id=campaign_id).order_by(Content.order).all()
-
-        # Serialize the list of content
-        content_schemas = [ContentSchema.from_orm(content) for content in content_list]
+        # Stream the content columns associated with the campaign, ordered by 'order', from a connection of their own
+        connection, partitions = execute_streaming(CAMPAIGN_CONTENTS, dict(campaign_id=campaign_id))
+
+        # An empty result is ambiguous; only then check whether the campaign exists
+        first = next(partitions, None)
+        if first is None:
+            connection.close()
+            campaign_exists = db.session.execute(CAMPAIGN_EXISTS, dict(campaign_id=campaign_id)).scalar()
+            if campaign_exists is None:
+                return error_response(f"Campaign with the ID '{campaign_id}' not found", "Campaign not found", 404)
+            return jsonify(dict(contents=[]))
 
         # Return the response
-        return ContentListResponse().dump(dict(contents=content_schemas)), 200
+        return stream_rows('contents', itertools.chain([first], partitions), connection=connection)
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting content for campaign {campaign_id}: {e}")
-        return ErrorResponse().dump(dict(message="Error getting content", error=str(e))), 500
+        # Still ours until stream_rows() takes it over; closing it twice is harmless
+        if connection is not None:
+            connection.close()
+        logger.exception("Error getting content for campaign %s", campaign_id)
+        return error_response("Error getting content", str(e), 500)
 
 @api_v1.route('/campaigns/active', methods=['GET'])
 def get_active_campaign():
@@ -944,25 +1093,58 @@ def get_active_campaign():
     """
     try:
         # Use db.session to query the active campaign record
-        campaign = db.session.query(Campaign).filter_by(active=True).first()
+        campaign = db.session.execute(ACTIVE_CAMPAIGN).scalar()
 
         if not campaign:
-            return ErrorResponse().dump(dict(message=f"Active Campaign not found", error="Active Campaign not found")), 404
-
-        # Serialize the campaign using Marshmallow schema
-        campaign_schema = CampaignSchema.from_orm(campaign)
+            return error_response(f"Active Campaign not found", "Active Campaign not found", 404)
 
-        # Return the response
-        return CampaignResponse().dump(dict(campaign=campaign_schema)), 200
+        return dict(campaign=campaign_to_dict(campaign)), 200
     except Exception as e:
-        get_traceback(e)
-        logger.error(f"Error getting active campaign: {e}")
-        return ErrorResponse().dump(dict(message="Error getting active campaign", error=str(e))), 500
+        logger.exception("Error getting active campaign")
+        return error_response("Error getting active campaign", str(e), 500)
 
 @api_v1.route('/')
 @app.route('/')
 def hello():
-    return redirect(SPOCK_FRONTEND, code=301)
+    return redirect(settings().spock_frontend, code=301)
+
+# region Job APIs
+@api_v1.route('/jobs/<job_id>/progress', methods=['GET'])
+def get_job_progress(job_id):
+    """
+    Stream Job Progress
+    ---
+    tags:
+      - Jobs
+    produces:
+      - text/event-stream
+    parameters:
+      - in: path
+        name: job_id
+        schema:
+          type: string
+        required: true
+        description: ID returned by an endpoint that answered 202 Accepted
+    responses:
+      200:
+        description: >
+          Server-Sent Events, one JSON object per event with job_id and state
+          (queued, running, succeeded or failed). The final event carries the
+          endpoint's status_code and its result (or error), then the stream closes.
+      404:
+        description: Job not found or expired
+        schema:
+          $ref: '#/definitions/ErrorResponse'
+    """
+    job = jobs.get_job(job_id)
+    if not job:
+        return error_response(f"Job with ID '{job_id}' not found", "Job not found", 404)
+
+    return Response(
+        job.stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 app.register_blueprint(api_v1)
 
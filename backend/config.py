@@ -1,17 +1,18 @@
+import functools
 import os
 
-from backend.db import get_db_uri
-
 # App variables
-## Configure upload folder
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 APP = None
 
-def configure_upload(app):
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
+## Configure upload folder
+@functools.cache
+def upload_folder():
+    # Resolved against this package, not the working directory, so it's the same wherever the app is started
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 
-    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+def configure_upload(app):
+    folder = upload_folder()
+    os.makedirs(folder, exist_ok=True)
 
- 
+    app.config['UPLOAD_FOLDER'] = folder
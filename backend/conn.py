@@ -1,19 +1,68 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
 from dotenv import load_dotenv
+from sqlalchemy.engine import URL
 
-load_dotenv()
 
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = int(os.getenv('DB_PORT'))
+@dataclass(frozen=True)
+class Settings:
+    db_name: str
+    db_user: Optional[str]
+    db_password: Optional[str]
+    db_host: str
+    db_port: int
+    # Milliseconds before PostgreSQL cancels a statement; 0 disables the limit
+    db_statement_timeout: int
 
-SPOCK_FRONTEND = os.getenv('SPOCK_FRONTEND')
-SPOCK_BACKEND = os.getenv('SPOCK_BACKEND')
+    spock_frontend: Optional[str]
+    spock_backend: Optional[str]
 
-DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?options=-csearch_path=spock_schema"
+    # Deployment environment; 'production' serves the prebuilt openapi.json
+    env: str
+    # Level for the backend's own loggers; DEBUG also logs request bodies
+    log_level: str
+    # Processes serving the API, None when unknown; background jobs are only offered when there is one
+    web_workers: Optional[int]
+    # Request threads per process; sizes the database connection pool
+    web_threads: int
 
+
+@lru_cache(maxsize=1)
+def settings() -> Settings:
+    # Read .env and the environment on first use rather than at import, so importing
+    # the models or schemas doesn't require a database configuration
+    load_dotenv()
+
+    return Settings(
+        db_name=os.environ['DB_NAME'],
+        db_user=os.getenv('DB_USER'),
+        db_password=os.getenv('DB_PASSWORD'),
+        db_host=os.getenv('DB_HOST', 'localhost'),
+        db_port=int(os.getenv('DB_PORT', 5432)),
+        db_statement_timeout=int(os.getenv('DB_STATEMENT_TIMEOUT', 5000)),
+        spock_frontend=os.getenv('SPOCK_FRONTEND'),
+        spock_backend=os.getenv('SPOCK_BACKEND'),
+        env=os.getenv('ENV', 'development'),
+        log_level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        # Set for its workers by gunicorn.conf.py, or by hand (e.g. WEB_WORKERS=1 for the Flask dev server)
+        web_workers=int(os.environ['WEB_WORKERS']) if 'WEB_WORKERS' in os.environ else None,
+        web_threads=int(os.getenv('GUNICORN_THREADS', 8)),
+    )
+
+
+@lru_cache(maxsize=1)
 def get_db_uri() -> str:
-    return DATABASE_URI
\ No newline at end of file
+    s = settings()
+    # psycopg2 named explicitly: newer SQLAlchemy releases default plain postgresql:// to psycopg 3
+    url = URL.create(
+        'postgresql+psycopg2',
+        username=s.db_user,
+        password=s.db_password,
+        host=s.db_host,
+        port=s.db_port,
+        database=s.db_name,
+    )
+    return url.render_as_string(hide_password=False)
@@ -1,33 +1,63 @@
 import logging
+from functools import lru_cache
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import raiseload, sessionmaker
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import OperationalError 
 
-from backend.conn import get_db_uri
-
-DATABASE_URL = get_db_uri()
-
-# Configure the logger
-logging.basicConfig(level=logging.ERROR)  # You can change the level as needed (e.g., DEBUG, INFO, WARNING)
+from backend.conn import get_db_uri, settings
+from backend.jobs import WORKER_THREADS
 
 db = None
 
+def engine_options():
+    # Shared by the Flask-SQLAlchemy engine (SQLALCHEMY_ENGINE_OPTIONS) and _create_engine()
+    threads = settings().web_threads
+    return dict(
+        # Test connections on checkout and replace them well before idle sockets get dropped upstream,
+        # instead of failing (or hanging) on the first query
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        # One connection per request thread and background job worker; a larger pool could never be used
+        pool_size=threads + WORKER_THREADS,
+        # Headroom for the dedicated connections streamed lists hold until their body is sent
+        max_overflow=max(threads // 4, 2),
+        connect_args={
+            'options': f'-csearch_path=spock_schema -cstatement_timeout={settings().db_statement_timeout}'
+        },
+    )
+
+@lru_cache(maxsize=1)
 def _create_engine():
-    return create_engine(DATABASE_URL)
+    # Built once per process so every session shares the same connection pool
+    return create_engine(get_db_uri(), **engine_options())
 
+@lru_cache(maxsize=1)
 def get_session():
     engine = _create_engine()
     try:
-        Session = sessionmaker(bind=engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
     except OperationalError as error:
         logging.error(f"Database connection error: {error}")
         return None
     
     return Session
 
+# Loader options for code that only touches an entity's own columns: any relationship access raises
+# instead of quietly issuing a lazy SELECT (or running an eager one nobody uses)
+STRICT_LOADING = (raiseload('*'),)
+
+def strict(statement):
+    """Apply STRICT_LOADING to a select(); pass STRICT_LOADING as options= to session.get() instead."""
+    return statement.options(*STRICT_LOADING)
+
+def violates_constraint(error, constraint_name):
+    # psycopg exposes the name of the violated constraint on the DBAPI error
+    diag = getattr(error.orig, 'diag', None)
+    return getattr(diag, 'constraint_name', None) == constraint_name
+
 def run_migrations(app):
     migrate = Migrate(app, db)
 
@@ -39,5 +69,7 @@ def load_db():
     if db:
         return db
     else:
-        db = SQLAlchemy()
+        # Keep attributes loaded after commit so handlers can serialize what they just wrote
+        # without a refresh() round trip
+        db = SQLAlchemy(session_options={'expire_on_commit': False})
         return db
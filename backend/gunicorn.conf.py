@@ -0,0 +1,31 @@
+import multiprocessing
+import os
+
+# Gunicorn settings for serving backend.app:app
+#
+# The API handlers spend nearly all of their time waiting on PostgreSQL, so
+# each worker process runs a pool of threads: a request blocked on the
+# database only holds one thread, not the whole worker.
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = 'gthread'
+# About one process per core: the threads, not extra processes, absorb the
+# waiting. Each thread may hold a database connection, so workers * threads
+# must stay below PostgreSQL's max_connections (100 by default).
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Recycle idle keep-alive connections quickly so threads are not held open
+keepalive = 5
+timeout = 30
+
+
+def post_fork(server, worker):
+    # Tell the app how many workers there are: background jobs are kept in the
+    # memory of the worker that accepted them, so they are only offered with one.
+    # Read from the arbiter rather than the settings above, so a -w on the
+    # command line (applied after this file) is accounted for too.
+    os.environ['WEB_WORKERS'] = str(server.num_workers)
+    # The app sizes its connection pool from the thread count; publish the one
+    # in effect, which may likewise come from --threads
+    os.environ['GUNICORN_THREADS'] = str(server.cfg.threads)
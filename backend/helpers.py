@@ -1,29 +1,78 @@
+import atexit
 import logging
-import traceback
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
+import orjson
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 
 import backend.config
 from backend.config import ALLOWED_EXTENSIONS
 from backend.config import configure_upload
-from backend.conn import get_db_uri
-from backend.db import run_migrations, load_db
+from backend.conn import get_db_uri, settings
+from backend.db import engine_options, run_migrations, load_db
 
 logger = logging.getLogger(__name__)
 
+_ALLOWED_SUFFIXES = tuple('.' + extension for extension in ALLOWED_EXTENSIONS)
+
 def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson; types orjson can't handle fall back to Flask's default."""
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return self.encode(obj).decode()
+
+    def encode(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self.option)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records as they are, leaving all formatting to the listener."""
+
+    def prepare(self, record):
+        # The stock prepare() formats the message and traceback on the logging thread so the
+        # record can be pickled; the queue here is in-process, so nothing needs pickling
+        return record
+
+def configure_logging():
+    # Request threads only enqueue records; a listener thread formats and writes them
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(logging.ERROR)
+
+    # Only our own loggers go below ERROR; third-party libraries (e.g. SQLAlchemy) stay quiet
+    logging.getLogger('backend').setLevel(settings().log_level)
 
 def create_flask_app():
+    configure_logging()
+
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     app.config['JSON_SORT_KEYS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'connect_args': {
-            'options': '-csearch_path=spock_schema'
-        }
-    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
     app.config['SQLALCHEMY_DATABASE_URI'] = get_db_uri()
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
@@ -36,8 +85,3 @@ def create_flask_app():
     db.init_app(app)
 
     return app
-
-import traceback
-
-def get_traceback(exception):
-    print(''.join(traceback.format_exception(type(exception), exception, exception.__traceback__)))
@@ -0,0 +1,131 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+
+import orjson
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+WORKER_THREADS = 2
+# Finished jobs stay around this long so late SSE subscribers still see the result
+FINISHED_JOB_TTL = 600
+# Seconds between SSE keep-alive comments while a job is still running
+HEARTBEAT_INTERVAL = 15
+
+_work_queue = queue.Queue()
+_workers = []
+_workers_lock = threading.Lock()
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class Job:
+    """A unit of work run on a background thread, with a replayable list of progress events."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.events = []
+        self.finished_at = None
+        self._changed = threading.Condition()
+        self.publish('queued')
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    def publish(self, state, **data):
+        with self._changed:
+            self.events.append(dict(job_id=self.id, state=state, **data))
+            if state in ('succeeded', 'failed'):
+                self.finished_at = time.monotonic()
+            self._changed.notify_all()
+
+    def stream(self):
+        # Yields Server-Sent Events from the first event on, ending once the job finishes
+        sent = 0
+        while True:
+            with self._changed:
+                if sent == len(self.events) and not self.done:
+                    self._changed.wait(HEARTBEAT_INTERVAL)
+                pending = self.events[sent:]
+                done = self.done
+
+            if not pending:
+                yield b': keep-alive\n\n'
+                continue
+
+            for event in pending:
+                yield b'data: ' + orjson.dumps(event) + b'\n\n'
+            sent += len(pending)
+
+            if done and sent == len(self.events):
+                return
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def submit(func, *args, **kwargs):
+    """
+    Queue func(*args, **kwargs) to run inside an app context on a worker thread.
+
+    func must return a (body, status_code) pair, like a view; it is published as the job's final event.
+    """
+    job = Job()
+    app = current_app._get_current_object()
+
+    with _jobs_lock:
+        _prune_finished_jobs()
+        _jobs[job.id] = job
+
+    _start_workers()
+    _work_queue.put((job, app, func, args, kwargs))
+    return job
+
+
+def _prune_finished_jobs():
+    expired_before = time.monotonic() - FINISHED_JOB_TTL
+    for job_id in [job_id for job_id, job in _jobs.items() if job.done and job.finished_at < expired_before]:
+        del _jobs[job_id]
+
+
+def _start_workers():
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(WORKER_THREADS):
+            worker = threading.Thread(target=_work, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+        atexit.register(_stop_workers)
+
+
+def _stop_workers():
+    for _ in _workers:
+        _work_queue.put(None)
+
+
+def _work():
+    while True:
+        item = _work_queue.get()
+        if item is None:
+            return
+
+        job, app, func, args, kwargs = item
+        job.publish('running')
+        try:
+            with app.app_context():
+                body, status_code = func(*args, **kwargs)
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.publish('failed', status_code=500, error=str(e))
+        else:
+            state = 'succeeded' if status_code < 400 else 'failed'
+            job.publish(state, status_code=status_code, result=body)
@@ -0,0 +1,57 @@
+"""Give the string columns explicit lengths
+
+Revision ID: 3f9a2c71d8e5
+Revises: e81f0c4b27d9
+Create Date: 2026-10-15 07:12:40.581934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a2c71d8e5'
+down_revision = 'e81f0c4b27d9'
+branch_labels = None
+depends_on = None
+
+# Fails on rows already longer than their new limit; shorten those before upgrading
+CONTENT_LENGTHS = {
+    'title': 256,
+    'subtitle': 256,
+    'image_url': 2048,
+    'image_filename': 255,
+    'image_path': 512,
+    'external_url': 2048,
+    'button_text': 64,
+    'button_link': 2048,
+}
+CAMPAIGN_NAME_LENGTH = 128
+
+
+def upgrade():
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        for column, length in CONTENT_LENGTHS.items():
+            batch_op.alter_column(column,
+                   existing_type=sa.VARCHAR(),
+                   type_=sa.String(length=length))
+
+    with op.batch_alter_table('campaign', schema='spock_schema') as batch_op:
+        batch_op.alter_column('name',
+               existing_type=sa.VARCHAR(),
+               type_=sa.String(length=CAMPAIGN_NAME_LENGTH),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('campaign', schema='spock_schema') as batch_op:
+        batch_op.alter_column('name',
+               existing_type=sa.String(length=CAMPAIGN_NAME_LENGTH),
+               type_=sa.VARCHAR(),
+               existing_nullable=False)
+
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        for column, length in CONTENT_LENGTHS.items():
+            batch_op.alter_column(column,
+                   existing_type=sa.String(length=length),
+                   type_=sa.VARCHAR())
@@ -0,0 +1,38 @@
+"""Allow a single active campaign
+
+Revision ID: 7c3e91b0d2f4
+Revises: 2afdb7d24acd
+Create Date: 2026-10-15 05:02:11.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e91b0d2f4'
+down_revision = '2afdb7d24acd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the most recently created active campaign before enforcing the constraint
+    op.execute(
+        "UPDATE spock_schema.campaign SET active = false "
+        "WHERE active AND id <> (SELECT max(id) FROM spock_schema.campaign WHERE active)"
+    )
+    op.create_exclude_constraint(
+        'campaign_single_active',
+        'campaign',
+        ('active', '='),
+        where=sa.text('active'),
+        using='btree',
+        deferrable=True,
+        initially='DEFERRED',
+        schema='spock_schema',
+    )
+
+
+def downgrade():
+    op.drop_constraint('campaign_single_active', 'campaign', schema='spock_schema')
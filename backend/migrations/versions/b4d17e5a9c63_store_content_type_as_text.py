@@ -0,0 +1,43 @@
+"""Store content_type as text with a check constraint
+
+Revision ID: b4d17e5a9c63
+Revises: 7c3e91b0d2f4
+Create Date: 2026-10-15 05:41:27.206114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d17e5a9c63'
+down_revision = '7c3e91b0d2f4'
+branch_labels = None
+depends_on = None
+
+CONTENT_TYPES = ('card', 'banner', 'image', 'modal')
+
+
+def upgrade():
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        batch_op.alter_column('content_type',
+               existing_type=postgresql.ENUM(*CONTENT_TYPES, name='contenttype'),
+               type_=sa.String(length=16),
+               existing_nullable=False,
+               postgresql_using='content_type::text')
+        batch_op.create_check_constraint('content_type_valid', sa.column('content_type').in_(CONTENT_TYPES))
+
+    postgresql.ENUM(name='contenttype').drop(op.get_bind())
+
+
+def downgrade():
+    postgresql.ENUM(*CONTENT_TYPES, name='contenttype').create(op.get_bind())
+
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        batch_op.drop_constraint('content_type_valid', type_='check')
+        batch_op.alter_column('content_type',
+               existing_type=sa.String(length=16),
+               type_=postgresql.ENUM(*CONTENT_TYPES, name='contenttype'),
+               existing_nullable=False,
+               postgresql_using='content_type::contenttype')
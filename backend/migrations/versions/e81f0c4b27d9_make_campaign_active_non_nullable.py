@@ -0,0 +1,34 @@
+"""Make campaign.active non-nullable with a server default
+
+Revision ID: e81f0c4b27d9
+Revises: b4d17e5a9c63
+Create Date: 2026-10-15 06:24:53.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81f0c4b27d9'
+down_revision = 'b4d17e5a9c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE spock_schema.campaign SET active = false WHERE active IS NULL")
+
+    with op.batch_alter_table('campaign', schema='spock_schema') as batch_op:
+        batch_op.alter_column('active',
+               existing_type=sa.BOOLEAN(),
+               nullable=False,
+               server_default=sa.text('false'))
+
+
+def downgrade():
+    with op.batch_alter_table('campaign', schema='spock_schema') as batch_op:
+        batch_op.alter_column('active',
+               existing_type=sa.BOOLEAN(),
+               nullable=True,
+               server_default=None)
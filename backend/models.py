@@ -1,14 +1,28 @@
 import enum
+from datetime import datetime
+from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Enum, text, ForeignKey, UniqueConstraint
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import Integer, String, Text, DateTime, Boolean, CheckConstraint, text, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.db import db
 
+CONTENT_ORDER_CONSTRAINT = '_campaign_order_uc'
+SINGLE_ACTIVE_CAMPAIGN_CONSTRAINT = 'campaign_single_active'
+
+# Column lengths, shared with the request schemas so oversized values are rejected before they reach the database
+NAME_LENGTH = 128
+TITLE_LENGTH = 256
+BUTTON_TEXT_LENGTH = 64
+URL_LENGTH = 2048
+# Most filesystems cap a file name at 255 bytes
+IMAGE_FILENAME_LENGTH = 255
+IMAGE_PATH_LENGTH = 512
+
 class CustomBaseModel():
-    created_at = Column(DateTime, server_default=text('now()'))
-    updated_at = Column(DateTime, server_default=text('now()'), onupdate=text('now()'))
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=text('now()'))
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=text('now()'), onupdate=text('now()'))
 
 class ContentType(enum.Enum):
     card = "card"
@@ -16,43 +30,66 @@ class ContentType(enum.Enum):
     image = "image"
     modal = "modal"
 
+# content_type is stored as plain text so loading rows skips enum coercion; the database still
+# rejects unknown values, and the request schemas reject them before they get that far
+CONTENT_TYPE_CHECK = "content_type IN ({})".format(', '.join(f"'{e.value}'" for e in ContentType))
+
 class Campaign(db.Model, CustomBaseModel):
     __tablename__ = 'campaign'
-    __table_args__ = {'schema': 'spock_schema'}
+    __table_args__ = (
+        # At most one active campaign. Deferred to commit so a single UPDATE can move the flag
+        # between rows; its partial index also serves lookups of the active campaign.
+        ExcludeConstraint(
+            ('active', '='),
+            name=SINGLE_ACTIVE_CAMPAIGN_CONSTRAINT,
+            using='btree',
+            where=text('active'),
+            deferrable=True,
+            initially='DEFERRED',
+        ),
+        {'schema': 'spock_schema'},
+    )
     
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    active = Column(Boolean, default=True)
-    contents = relationship("Content", back_populates="campaign")
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(NAME_LENGTH), nullable=False)
+    # Inactive unless asked for: with at most one active campaign allowed, defaulting to true would
+    # make any insert that leaves it out fail whenever another campaign is active
+    active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text('false'))
+    # Loading campaigns fetches their contents with one IN query per batch rather than one query
+    # per campaign; routes that only need the campaign's own columns turn this off with raiseload()
+    contents: Mapped[List["Content"]] = relationship(back_populates="campaign", lazy="selectin", order_by="Content.order")
 
 
 class Content(db.Model, CustomBaseModel):
     __tablename__ = 'content'
-    __table_args__ = {'schema': 'spock_schema'}
+    __table_args__ = (
+        # Its unique index on (campaign_id, order) also serves listing a campaign's contents in order
+        UniqueConstraint('campaign_id', 'order', name=CONTENT_ORDER_CONSTRAINT),
+        CheckConstraint(CONTENT_TYPE_CHECK, name='content_type_valid'),
+        {'schema': 'spock_schema'},
+    )
 
-    id = Column(Integer, primary_key=True)
-    content_type = Column(Enum(ContentType), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    content_type: Mapped[str] = mapped_column(String(16), nullable=False)
 
-    order = Column(db.Integer, nullable=False)
+    order: Mapped[int] = mapped_column(Integer, nullable=False)
     
-    title = Column(String, nullable=False)
-    subtitle = Column(String, nullable=True)
-    description = Column(Text, nullable=True)
+    title: Mapped[str] = mapped_column(String(TITLE_LENGTH), nullable=False)
+    subtitle: Mapped[Optional[str]] = mapped_column(String(TITLE_LENGTH), nullable=True)
+    description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
-    image_url = Column(String, nullable=True)  # URL for a locally-hosted image
-    image_filename = Column(String, nullable=True)  # Filename of the uploaded image
-    image_path = Column(String, nullable=True)  # Path to the uploaded image
-    external_url = Column(String, nullable=True) # URL for a externally-hosted image
+    image_url: Mapped[Optional[str]] = mapped_column(String(URL_LENGTH), nullable=True)  # URL for a locally-hosted image
+    image_filename: Mapped[Optional[str]] = mapped_column(String(IMAGE_FILENAME_LENGTH), nullable=True)  # Filename of the uploaded image
+    image_path: Mapped[Optional[str]] = mapped_column(String(IMAGE_PATH_LENGTH), nullable=True)  # Path to the uploaded image
+    external_url: Mapped[Optional[str]] = mapped_column(String(URL_LENGTH), nullable=True) # URL for a externally-hosted image
     
-    button_text = Column(String, nullable=True)
-    button_link = Column(String, nullable=True)
+    button_text: Mapped[Optional[str]] = mapped_column(String(BUTTON_TEXT_LENGTH), nullable=True)
+    button_link: Mapped[Optional[str]] = mapped_column(String(URL_LENGTH), nullable=True)
     
-    start_date = Column(DateTime, nullable=True)
-    end_date = Column(DateTime, nullable=True)
-
-    campaign_id = Column(Integer, ForeignKey('spock_schema.campaign.id'))
-    campaign = relationship("Campaign", back_populates="contents")
+    start_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    end_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
-    __table_args__ = (UniqueConstraint('campaign_id', 'order', name='_campaign_order_uc'),)
+    campaign_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey('spock_schema.campaign.id'))
+    campaign: Mapped[Optional["Campaign"]] = relationship(back_populates="contents")
 
     
\ No newline at end of file
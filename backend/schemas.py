@@ -1,12 +1,13 @@
+from operator import attrgetter
 from typing import Optional
 
-from marshmallow import Schema, fields
-from marshmallow import validates, ValidationError
-from marshmallow_enum import EnumField
+from marshmallow import Schema, fields, validate
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
-from marshmallow.decorators import post_load
 
-from backend.models import ContentType, Content, Campaign
+from backend.models import (
+    ContentType, Content, Campaign,
+    NAME_LENGTH, TITLE_LENGTH, BUTTON_TEXT_LENGTH, URL_LENGTH, IMAGE_FILENAME_LENGTH, IMAGE_PATH_LENGTH,
+)
 
 # region Base Schemas
 
@@ -16,202 +17,137 @@ class BaseRequestSchema(Schema):
 class BaseResponseSchema(Schema):
     pass
 
+class PageRequest(BaseRequestSchema):
+    limit = fields.Integer(load_default=50, validate=validate.Range(min=1, max=500))
+    cursor = fields.Integer(load_default=0, validate=validate.Range(min=0))
+
 # region Content Schemas
 
 class ContentBaseSchema(Schema):
-    content_type = fields.String(required=True)
+    # Loads to a ContentType member; unknown values are rejected with the list of allowed ones
+    content_type = fields.Enum(ContentType, by_value=True, required=True)
     
-    title = fields.String(required=True)
-    subtitle = fields.String(allow_none=True)
+    title = fields.String(required=True, validate=validate.Length(max=TITLE_LENGTH))
+    subtitle = fields.String(allow_none=True, validate=validate.Length(max=TITLE_LENGTH))
     description = fields.String(allow_none=True)
         
-    button_text = fields.String(allow_none=True)
-    button_link = fields.String(allow_none=True)
+    button_text = fields.String(allow_none=True, validate=validate.Length(max=BUTTON_TEXT_LENGTH))
+    button_link = fields.String(allow_none=True, validate=validate.Length(max=URL_LENGTH))
     
     start_date = fields.DateTime(allow_none=True)
     end_date = fields.DateTime(allow_none=True)
     
-    image_filename = fields.String(allow_none=True)
-    image_path = fields.String(allow_none=True)
+    image_filename = fields.String(allow_none=True, validate=validate.Length(max=IMAGE_FILENAME_LENGTH))
+    image_path = fields.String(allow_none=True, validate=validate.Length(max=IMAGE_PATH_LENGTH))
     
-    image_url = fields.String(allow_none=True)
-    external_url = fields.String(allow_none=True)
+    image_url = fields.String(allow_none=True, validate=validate.Length(max=URL_LENGTH))
+    external_url = fields.String(allow_none=True, validate=validate.Length(max=URL_LENGTH))
 
     order = fields.Integer(allow_none=True)
     campaign_id = fields.Integer(allow_none=True)
-    
-    @post_load
-    def make_content(self, data, **kwargs):
-        return data
-    
-    class Meta:
-        ordered = True
-
-class ContentSchema(ContentBaseSchema):
-    id = fields.Integer(required=True)
-
-    @classmethod
-    def from_orm(cls, content: Content):
-        return cls().load(
-            data=dict(
-                id=content.id,
-                title=content.title,
-                subtitle=content.subtitle,
-                content_type=content.content_type.value,
-                description=content.description,
-                button_text=content.button_text,
-                button_link=content.button_link,
-                start_date=content.start_date,
-                end_date=content.end_date,
-                order=content.order,
-                image_url=content.image_url,
-                external_url=content.external_url,
-                campaign_id=content.campaign_id,
-            )
-        )
-    
-class ContentCreateRequest(BaseRequestSchema):
-    title = fields.String(required=True, allow_none=False)
-    subtitle = fields.String(allow_none=True)
-
-    content_type = fields.String(required=True)
-    
-    description = fields.String(allow_none=True)
-    
-    button_text = fields.String(allow_none=True)
-    button_link = fields.String(allow_none=True)
-    
-    start_date = fields.DateTime(allow_none=True)
-    end_date = fields.DateTime(allow_none=True)
 
-    external_url = fields.String(allow_none=True)
-    
-    order = fields.Integer(allow_none=False)
-    campaign_id = fields.Integer(allow_none=False)
+# ContentSchema's fields in output order. ContentSchema, content_to_dict() and the list endpoints'
+# selected columns are all built from this, so every endpoint returns the same keys in the same order.
+CONTENT_FIELDS = (
+    'id',
+    'content_type',
+    'title',
+    'subtitle',
+    'description',
+    'button_text',
+    'button_link',
+    'start_date',
+    'end_date',
+    'image_filename',
+    'image_path',
+    'image_url',
+    'external_url',
+    'order',
+    'campaign_id',
+)
 
+class ContentSchema(ContentBaseSchema):
     class Meta:
-        ordered = True
-
-    @validates('content_type')
-    def validate_content_type(self, value, data_key):
-        if value not in ContentType._value2member_map_:
-            raise ValidationError(f"Invalid content_type '{value}'. Must be one of: {[e.value for e in ContentType]}")
+        fields = CONTENT_FIELDS
 
+    id = fields.Integer(required=True)
+    # Stored as its string value
+    content_type = fields.String(required=True)
 
-class ContentUpdateRequest(ContentBaseSchema, BaseRequestSchema):
-    title = fields.String(required=False, allow_none=True)
-    subtitle = fields.String(allow_none=True)
+# Meta.fields silently drops a declared field left out of CONTENT_FIELDS
+assert set(CONTENT_FIELDS) == set(ContentSchema._declared_fields), "CONTENT_FIELDS is out of step with ContentSchema"
 
-    content_type = fields.String(required=False)
+_content_values = attrgetter(*CONTENT_FIELDS)
 
-    description = fields.String(allow_none=True)
+def content_to_dict(content: Content) -> dict:
+    """
+    ContentSchema's output built by hand, for read endpoints that return a stored row as-is.
 
-    button_text = fields.String(allow_none=True)
-    button_link = fields.String(allow_none=True)
-
-    start_date = fields.DateTime(allow_none=True)
-    end_date = fields.DateTime(allow_none=True)
+    Dates are left as datetimes for the orjson provider to encode.
+    """
+    return dict(zip(CONTENT_FIELDS, _content_values(content)))
 
-    external_url = fields.String(allow_none=True)
-
-    order = fields.Integer(allow_none=True)
+class ContentCreateRequest(ContentBaseSchema, BaseRequestSchema):
+    order = fields.Integer(required=True, allow_none=False)
+    campaign_id = fields.Integer(required=True, allow_none=False)
 
     class Meta:
-        ordered = True
-
-    @validates('content_type')
-    def validate_content_type(self, value, data_key):
-        if value not in ContentType._value2member_map_:
-            raise ValidationError(f"Invalid content_type '{value}'. Must be one of: {[e.value for e in ContentType]}")
-
+        # Set by the image upload endpoint, not by the client
+        exclude = ('image_filename', 'image_path', 'image_url')
 
+class ContentUpdateRequest(ContentBaseSchema, BaseRequestSchema):
+    title = fields.String(required=False, allow_none=True, validate=validate.Length(max=TITLE_LENGTH))
+    content_type = fields.Enum(ContentType, by_value=True, required=False)
 
 class ContentResponse(BaseResponseSchema):
     content = fields.Nested(ContentSchema)
 
-    class Meta:
-        ordered = True
-
-class UploadResponse(Schema):
-    message = fields.String(required=True)
-    filename = fields.String(required=True)
-    path = fields.String(required=True)
-
-    @post_load
-    def make_upload(self, data, **kwargs):
-        return data
-
+# Documents the error body for the OpenAPI spec; handlers build it with app.error_response()
 class ErrorResponse(Schema):
     message = fields.String(required=True)
     error = fields.String(allow_none=True)
 
-    @post_load
-    def make_error(self, data, **kwargs):
-        return data
-    
-    class Meta:
-        ordered = True
-
 class ContentListResponse(BaseResponseSchema):
     contents = fields.Nested(ContentSchema, many=True)
+    next_cursor = fields.Integer(allow_none=True)
 
-    @post_load
-    def make_list(self, data, **kwargs):
-        return data
-
-    class Meta:
-        ordered = True
-    
 
 # region Campaign Schema
 class CampaignBaseSchema(Schema):
-    name = fields.String(required=True)
+    name = fields.String(required=True, validate=validate.Length(max=NAME_LENGTH))
     active = fields.Boolean(dump_default=False)
 
-    @post_load
-    def make_campaign(self, data, **kwargs):
-        return data
+# CampaignSchema's fields in output order; see CONTENT_FIELDS
+CAMPAIGN_FIELDS = ('id', 'name', 'active')
 
+class CampaignSchema(CampaignBaseSchema):
     class Meta:
-        ordered = True
+        fields = CAMPAIGN_FIELDS
 
-class CampaignSchema(CampaignBaseSchema):
     id = fields.Integer(required=True)
 
-    @classmethod
-    def from_orm(cls, campaign: Campaign):
-        return cls().load(data=dict(
-            id=campaign.id,
-            name=campaign.name,
-            active=campaign.active
-        ))
+assert set(CAMPAIGN_FIELDS) == set(CampaignSchema._declared_fields), "CAMPAIGN_FIELDS is out of step with CampaignSchema"
+
+def campaign_to_dict(campaign: Campaign) -> dict:
+    # CampaignSchema's output built by hand
+    return {'id': campaign.id, 'name': campaign.name, 'active': campaign.active}
 
 class CampaignCreateRequest(BaseRequestSchema):
-    name = fields.String(required=True)
+    name = fields.String(required=True, validate=validate.Length(max=NAME_LENGTH))
     active = fields.Boolean(dump_default=False)
 
-    class Meta:
-        ordered = True
-
 class CampaignUpdateRequest(CampaignBaseSchema, BaseRequestSchema):
-    name = fields.String(required=False)
+    name = fields.String(required=False, validate=validate.Length(max=NAME_LENGTH))
     active = fields.Boolean(dump_default=False)
 
-    class Meta:
-        ordered = True
-
 class CampaignResponse(BaseResponseSchema):
     campaign = fields.Nested(CampaignSchema)
 
-    class Meta:
-        ordered = True
-
 class CampaignListResponse(BaseResponseSchema):
     campaigns = fields.Nested(CampaignSchema, many=True)
+    next_cursor = fields.Integer(allow_none=True)
 
-    @post_load
-    def make_list(self, data, **kwargs):
-        return data
-
-    class Meta:
-        ordered = True
+# region Job Schemas
+class JobAccepted(BaseResponseSchema):
+    job_id = fields.String(required=True)
+    progress_url = fields.String(required=True)
@@ -0,0 +1,22 @@
+"""Regenerate backend/openapi.json from the API's schemas and route docstrings.
+
+Run from the project root after changing an endpoint or schema:
+
+    python -m backend.scripts.build_openapi
+
+With ENV=production the API serves this file instead of generating the spec
+at runtime.
+"""
+import orjson
+
+from backend.app import OPENAPI_PATH, build_openapi_spec
+
+
+def main():
+    document = orjson.dumps(build_openapi_spec(), option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    OPENAPI_PATH.write_bytes(document + b'\n')
+    print(f"Wrote {OPENAPI_PATH}")
+
+
+if __name__ == '__main__':
+    main()
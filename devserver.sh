@@ -21,7 +21,8 @@ echo "Initializing database schema..."
 
 # Start the backend server using Poetry
 
-poetry run flask --app app run --debug &
+# A single process, so background jobs can be offered
+WEB_WORKERS=1 poetry run flask --app app run --debug &
 
 # Start the frontend server using npm
 cd ../frontend && npm run dev &
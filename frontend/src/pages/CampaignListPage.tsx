@@ -10,13 +10,20 @@ import { FaTrash, FaEye } from "react-icons/fa"; // Removed FaEdit as it was unu
 const fetchCampaigns = async (): Promise<Campaign[]> => {
   // Assuming the backend runs on the same origin or is proxied
   // Adjust the URL if your backend runs elsewhere (e.g., http://localhost:8000/v1/campaign)
-  const response = await fetch(`${API_BASE_URL}/v1/campaign`);
-  if (!response.ok) {
-    const errorData: ErrorResponse = await response.json().catch(() => ({ message: "Unknown error" }));
-    throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
+  // The list is paginated; keep following next_cursor until the last page
+  const campaigns: Campaign[] = [];
+  let cursor: number | null | undefined = 0;
+  while (cursor != null) {
+    const response = await fetch(`${API_BASE_URL}/v1/campaign?cursor=${cursor}`);
+    if (!response.ok) {
+      const errorData: ErrorResponse = await response.json().catch(() => ({ message: "Unknown error" }));
+      throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
+    }
+    const data: CampaignListResponse = await response.json();
+    campaigns.push(...(data.campaigns || [])); // Treat a missing campaigns array as empty
+    cursor = data.next_cursor;
   }
-  const data: CampaignListResponse = await response.json();
-  return data.campaigns || []; // Return empty array if campaigns is undefined
+  return campaigns;
 };
 
 const deleteCampaign = async (campaignId: number): Promise<void> => {
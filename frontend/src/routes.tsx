@@ -56,15 +56,21 @@ const fetchCampaignContent = async (campaignId: number): Promise<Content[]> => {
   return data.contents || [];
 };
 
-// Fetches all content
+// Fetches all content, following the paginated list until the last page
 const fetchAllContent = async (): Promise<Content[]> => {
-  const response = await fetch(`${API_BASE_URL}/v1/content`);
-  if (!response.ok) {
-    const errorData: ErrorResponse = await response.json().catch(() => ({ message: "Unknown error fetching content" }));
-    throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
+  const contents: Content[] = [];
+  let cursor: number | null | undefined = 0;
+  while (cursor != null) {
+    const response = await fetch(`${API_BASE_URL}/v1/content?cursor=${cursor}`);
+    if (!response.ok) {
+      const errorData: ErrorResponse = await response.json().catch(() => ({ message: "Unknown error fetching content" }));
+      throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
+    }
+    const data: ContentListResponse = await response.json();
+    contents.push(...(data.contents || []));
+    cursor = data.next_cursor;
   }
-  const data: ContentListResponse = await response.json();
-  return data.contents || [];
+  return contents;
 };
 
 // Fetches a single content item by ID
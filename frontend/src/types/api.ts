@@ -17,6 +17,7 @@ export interface Campaign {
 // From #/definitions/CampaignListResponse
 export interface CampaignListResponse {
   campaigns?: Campaign[]; // Optional based on schema
+  next_cursor?: number | null; // Set when more pages are available
 }
 
 // From #/definitions/CampaignCreateRequest
@@ -55,6 +56,7 @@ export interface Content {
 // From #/definitions/ContentListResponse
 export interface ContentListResponse {
   contents?: Content[]; // Optional based on schema
+  next_cursor?: number | null; // Set when more pages are available
 }
 
 // From #/definitions/ContentCreateRequest